@@ -58,13 +58,13 @@ SEED_B = 13
 # `1 - BW_threshold` will be set `True`. [grayscale value, 0-1].
 BW_THRESHOLD = None  # Leave it at None. Use `TARGET_TRANSPARENCY` instead.
 
-# 2) Newton solver
-# ----------------
-# A Newton solver is employed per image frame to try solve for the grayscale
-# threshold that would result in the given target transparency. Transparency is
-# defined as the number of `True / 1 / valve on` elements over the total number
-# of elements. This method tends to minimize the fluctuation of the resulting
-# valve transparency over each frame. [ratio, 0-1].
+# 2) Target transparency
+# ----------------------
+# The grayscale threshold that would result in the given target transparency is
+# solved for per image frame by a lookup in the cumulative histogram of the
+# frame. Transparency is defined as the number of `True / 1 / valve on` elements
+# over the total number of elements. This method tends to minimize the
+# fluctuation of the resulting valve transparency over each frame. [ratio, 0-1].
 TARGET_TRANSPARENCY = 0.4
 
 # Minimum valve on/off duration [number of frames].
@@ -124,9 +124,14 @@ _pxs = _np.arange(
 )
 _grid_x, _grid_y = _np.meshgrid(_pxs, _pxs)  # shape: (15, 15), (15, 15)
 # `grid_x` and `grid_y` map /all/ integer PCS coordinates. We only need the
-# locations that actually correspond to a valve.
-valve2px_x = _np.reshape(_grid_x, -1)[1::2]  # shape: (112,)
-valve2px_y = _np.reshape(_grid_y, -1)[1::2]  # shape: (112,)
+# locations that actually correspond to a valve. Store them as contiguous
+# `int32` arrays, instead of strided `int64` views, for cache-friendly gathers.
+# Shapes: (112,)
+valve2px_x = _np.ascontiguousarray(_grid_x.ravel()[1::2], dtype=_np.int32)
+valve2px_y = _np.ascontiguousarray(_grid_y.ravel()[1::2], dtype=_np.int32)
+# Same pixel locations, but as a linear index into a flattened noise image.
+# A single gather instead of two.
+valve2px_flat = valve2px_y * N_PIXELS + valve2px_x  # shape: (112,)
 
 # Tidy up the namespace
 del _pxs, _grid_x, _grid_y
@@ -136,27 +141,32 @@ del _os, _np
 #  create_header_string
 # ------------------------------------------------------------------------------
 
+# All settings are fixed at import time, so the header gets formatted only once.
+# Just the `{date}` field is left to be filled in when the header is requested.
+_w = 20
+_HEADER_TEMPLATE = (
+    f"{'TYPE':<{_w}}OpenSimplex noise v{__version__}\n"
+    f"{'DATE':<{_w}}{{date}}\n\n"
+    f"{'N_FRAMES':<{_w}}{N_FRAMES}\n"
+    f"{'DT_FRAME':<{_w}}{DT_FRAME} s\n\n"
+    f"{'BW_THRESHOLD':<{_w}}{BW_THRESHOLD}\n"
+    f"{'TARGET_TRANSPARENCY':<{_w}}{TARGET_TRANSPARENCY}\n\n"
+    f"{'FEATURE_SIZE_A':<{_w}}{FEATURE_SIZE_A}\n"
+    f"{'FEATURE_SIZE_B':<{_w}}{FEATURE_SIZE_B}\n\n"
+    f"{'T_STEP_A':<{_w}}{T_STEP_A}\n"
+    f"{'T_STEP_B':<{_w}}{T_STEP_B}\n\n"
+    f"{'SEED_A':<{_w}}{SEED_A}\n"
+    f"{'SEED_B':<{_w}}{SEED_B}\n\n"
+    f"{'MIN_VALVE_DURATION':<{_w}}{MIN_VALVE_DURATION} frames\n\n"
+    f"{'PCS_PIXEL_DIST':<{_w}}{PCS_PIXEL_DIST}\n"
+    f"{'N_PIXELS':<{_w}}{N_PIXELS}\n"
+    f"{'X_STEP_A':<{_w}}{X_STEP_A}\n"
+    f"{'X_STEP_B':<{_w}}{X_STEP_B}\n\n"
+)
+del _w
+
 
 def create_header_string() -> str:
-    w = 20
-    header_str = (
-        f"{'TYPE':<{w}}OpenSimplex noise v{__version__}\n"
-        f"{'DATE':<{w}}{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-        f"{'N_FRAMES':<{w}}{N_FRAMES}\n"
-        f"{'DT_FRAME':<{w}}{DT_FRAME} s\n\n"
-        f"{'BW_THRESHOLD':<{w}}{BW_THRESHOLD}\n"
-        f"{'TARGET_TRANSPARENCY':<{w}}{TARGET_TRANSPARENCY}\n\n"
-        f"{'FEATURE_SIZE_A':<{w}}{FEATURE_SIZE_A}\n"
-        f"{'FEATURE_SIZE_B':<{w}}{FEATURE_SIZE_B}\n\n"
-        f"{'T_STEP_A':<{w}}{T_STEP_A}\n"
-        f"{'T_STEP_B':<{w}}{T_STEP_B}\n\n"
-        f"{'SEED_A':<{w}}{SEED_A}\n"
-        f"{'SEED_B':<{w}}{SEED_B}\n\n"
-        f"{'MIN_VALVE_DURATION':<{w}}{MIN_VALVE_DURATION} frames\n\n"
-        f"{'PCS_PIXEL_DIST':<{w}}{PCS_PIXEL_DIST}\n"
-        f"{'N_PIXELS':<{w}}{N_PIXELS}\n"
-        f"{'X_STEP_A':<{w}}{X_STEP_A}\n"
-        f"{'X_STEP_B':<{w}}{X_STEP_B}\n\n"
+    return _HEADER_TEMPLATE.format(
+        date=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     )
-
-    return header_str
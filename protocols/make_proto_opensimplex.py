@@ -33,6 +33,7 @@ from matplotlib import animation
 
 from utils_matplotlib import move_figure
 from utils_pillow import fig2img_RGB
+from utils_img_stack import quantize_stack
 from utils_valves_stack import (
     adjust_minimum_valve_durations,
     valve_on_off_PDFs,
@@ -40,7 +41,6 @@ from utils_valves_stack import (
 from utils_protocols import (
     generate_OpenSimplex_grayscale_img_stack,
     binarize_img_stack,
-    compute_valves_stack,
     export_protocol_to_disk,
 )
 
@@ -94,23 +94,29 @@ else:
         img_stack_gray = cache["img_stack_gray"]
     print(f"done in {(perf_counter() - tick):.2f} s\n")
 
-# Binarize OpenSimplex noise
+    if img_stack_gray.dtype != np.uint8:
+        # Cache was written before the noise got quantized to 8-bit grayscale
+        # levels. The binarization expects levels [0-255], not floats [0-1].
+        img_stack_gray = quantize_stack(img_stack_gray)
+
+# Binarize OpenSimplex noise and map it onto the valve locations
 (
     img_stack_BW,
     alpha_BW,
     alpha_BW_did_converge,
+    valves_stack,
+    alpha_valves,
 ) = binarize_img_stack(img_stack_gray)
 
 # Determine which noise image stack to plot later
 if SHOW_NOISE_AS_GRAY:
     img_stack_plot = img_stack_gray
+    img_plot_vmax = 255  # Grayscale levels [0-255]
 else:
     img_stack_plot = img_stack_BW
+    img_plot_vmax = 1
     del img_stack_gray  # Not needed anymore -> Free up large chunk of mem
 
-# Map OpenSimplex noise onto valve locations
-valves_stack, alpha_valves = compute_valves_stack(img_stack_BW)
-
 # Adjust minimum valve durations
 (
     valves_stack_adj,
@@ -148,7 +154,7 @@ np.save(CFG.EXPORT_PATH_NO_EXT + "_valves_stack.npy", valves_stack_adj)
 # The transparencies per frame
 with open(CFG.EXPORT_PATH_NO_EXT + "_alpha.txt", "w", encoding="utf-8") as f:
     if CFG.TARGET_TRANSPARENCY is not None:
-        f.write("Newton solver was used to solve for a wanted transparency.\n")
+        f.write("Histogram was used to solve for a wanted transparency.\n")
         failed_convergences = CFG.N_FRAMES - sum(alpha_BW_did_converge)
         if failed_convergences > 0:
             f.write(f"{failed_convergences:d} frames failed to converge!\n")
@@ -206,14 +212,14 @@ ax_text = ax.text(0, 1.02, "", transform=ax.transAxes)
 # on a white background, than it is reversed. This is opposite to a masking
 # layer in Photoshop, where a white region indicates True. Here, black indicates
 # True.
-img_stack_plot = 1 - img_stack_plot
+img_stack_plot = img_plot_vmax - img_stack_plot
 
 if SHOW_NOISE_IN_PLOT:
     hax_noise = ax.imshow(
         img_stack_plot[0],
         cmap="gray",
         vmin=0,
-        vmax=1,
+        vmax=img_plot_vmax,
         interpolation="none",
         origin="lower",
         extent=[
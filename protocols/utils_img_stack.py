@@ -15,7 +15,6 @@ from time import perf_counter
 from typing import Tuple, Union
 
 import numpy as np
-from scipy import optimize
 from numba import njit, prange
 from tqdm import trange
 
@@ -29,8 +28,8 @@ def add_stack_B_to_A(stack_A: np.ndarray, stack_B: np.ndarray):
     the matching frame inside stack A.
     NOTE: In-place operation on argument `stack_A`.
     """
-    for i in prange(stack_A.shape[0]):  # pylint: disable=not-an-iterable
-        np.add(stack_A[i], stack_B[i], out=stack_A[i])
+    # A single ufunc call over the full stack instead of one call per frame
+    np.add(stack_A, stack_B, out=stack_A)
 
 
 # ------------------------------------------------------------------------------
@@ -92,11 +91,72 @@ def rescale_stack(stack: np.ndarray, symmetrically: bool = True):
     print(f"done in {(perf_counter() - tick):.2f} s\n")
 
 
+# ------------------------------------------------------------------------------
+#  quantize_stack
+# ------------------------------------------------------------------------------
+
+
+def quantize_stack(stack: np.ndarray) -> np.ndarray:
+    """Quantize all images in the stack from float values within the range
+    [0, 1] to 8-bit grayscale levels within the range [0, 255]. This reduces the
+    memory footprint of the stack and the memory traffic of all subsequent
+    operations on it by a factor of 4 compared to `float32`.
+
+    Args:
+        stack (numpy.ndarray):
+            2D image stack [time, y-pixel, x-pixel] containing float values
+            within the range [0, 1].
+
+    Returns:
+        The 2D image stack [time, y-pixel, x-pixel] as `uint8` values.
+    """
+    print("Quantizing noise...")
+    tick = perf_counter()
+
+    stack_out = np.empty(stack.shape, dtype=np.uint8)
+    for i in trange(stack.shape[0]):  # pylint: disable=not-an-iterable
+        # Round to the nearest level. Assignment truncates towards zero.
+        stack_out[i] = stack[i] * 255 + 0.5
+
+    print(f"done in {(perf_counter() - tick):.2f} s\n")
+    return stack_out
+
+
 # ------------------------------------------------------------------------------
 #  binarize_stack
 # ------------------------------------------------------------------------------
 
 
+@njit(
+    cache=True,
+    nogil=True,
+)
+def _binarize_frame(
+    frame_in: np.ndarray,
+    threshold: float,
+    valve2px_flat: np.ndarray,
+    frame_BW: np.ndarray,
+    valves: np.ndarray,
+) -> int:
+    """Binarize a single frame and, in the same pass while the frame is still
+    hot in cache, sample the resulting states at the valve pixel locations.
+    Returns the number of `True` pixels.
+    NOTE: In-place operation on arguments `frame_BW` and `valves`.
+    """
+    N_true = 0
+    for y in range(frame_in.shape[0]):
+        for x in range(frame_in.shape[1]):
+            if frame_in[y, x] > threshold:
+                frame_BW[y, x] = 1
+                N_true += 1
+
+    frame_BW_flat = frame_BW.ravel()
+    for j in range(valve2px_flat.size):
+        valves[j] = frame_BW_flat[valve2px_flat[j]]
+
+    return N_true
+
+
 @njit(
     cache=True,
     parallel=True,
@@ -105,16 +165,25 @@ def rescale_stack(stack: np.ndarray, symmetrically: bool = True):
 def binarize_stack_using_threshold(
     stack_in: np.ndarray,
     threshold: float,
+    valve2px_flat: np.ndarray,
     stack_BW: np.ndarray,
     alpha: np.ndarray,
+    valves_stack: np.ndarray,
 ):
-    """NOTE: In-place operation on arguments `stack_BW` and `alpha`"""
+    """NOTE: In-place operation on arguments `stack_BW`, `alpha` and
+    `valves_stack`.
+    """
+    N_pixels = stack_in.shape[1] * stack_in.shape[2]
+
     for i in prange(stack_in.shape[0]):  # pylint: disable=not-an-iterable
-        true_pxs = np.where(stack_in[i] > threshold)
-        alpha[i] = len(true_pxs[0]) / stack_in.shape[1] / stack_in.shape[2]
-        # Below is the Numba equivalent of: stack_BW[i][true_pxs] = 1
-        for j in prange(true_pxs[0].size):  # pylint: disable=not-an-iterable
-            stack_BW[i, true_pxs[0][j], true_pxs[1][j]] = 1
+        N_true = _binarize_frame(
+            stack_in[i],
+            threshold,
+            valve2px_flat,
+            stack_BW[i],
+            valves_stack[i],
+        )
+        alpha[i] = N_true / N_pixels
 
 
 @njit(
@@ -122,42 +191,50 @@ def binarize_stack_using_threshold(
     parallel=True,
     nogil=True,
 )
-def _newton_fun(x, arr_in, target):
-    true_pxs = np.where(arr_in > x)
-    return target - len(true_pxs[0]) / arr_in.shape[0] / arr_in.shape[1]
-
-
-def binarize_stack_using_newton(
+def binarize_stack_using_histogram(
     stack_in: np.ndarray,
     target_transparency: float,
+    valve2px_flat: np.ndarray,
     stack_BW: np.ndarray,
     alpha: np.ndarray,
     alpha_did_converge: np.ndarray,
+    valves_stack: np.ndarray,
+    tol: float = 0.02,
 ):
-    """Using Newton's method to solve for the given transparency:
-    https://docs.scipy.org/doc/scipy/reference/generated/scipy.optimize.newton.html
-    NOTE: In-place operation on arguments `stack_BW`, `alpha` and
-    `alpha_did_converge`.
+    """Solve for the threshold resulting in the given transparency by looking it
+    up in the cumulative histogram of each frame. This takes a single pass over
+    the pixels to build the histogram and another one to apply the threshold,
+    instead of iterating a root solver that has to recount all pixels on every
+    iteration. The `uint8` grayscale levels of `stack_in` map 1:1 onto the 256
+    histogram bins.
+    NOTE: In-place operation on arguments `stack_BW`, `alpha`,
+    `alpha_did_converge` and `valves_stack`.
     """
-    # NOTE: Can't `njit` on `optimize.newton()`. We use python package
-    # `scipy-numba` to get scipy to make use of numba.
-
-    for i in trange(stack_in.shape[0]):
-        # Solve for transparency
-        try:
-            threshold = optimize.newton(
-                _newton_fun,
-                1 - target_transparency,
-                args=(stack_in[i], target_transparency),
-                maxiter=20,
-                tol=0.02,
-            )
-        except:
-            print(f"\nWARNING: Convergence failed @ frame {i}")
-            alpha_did_converge[i] = False
-        else:
-            alpha_did_converge[i] = True
-
-        true_pxs = np.where(stack_in[i] > threshold)
-        alpha[i] = len(true_pxs[0]) / stack_in.shape[1] / stack_in.shape[2]
-        stack_BW[i][true_pxs] = 1
+    N_pixels = stack_in.shape[1] * stack_in.shape[2]
+    N_target = target_transparency * N_pixels
+
+    for i in prange(stack_in.shape[0]):  # pylint: disable=not-an-iterable
+        hist = np.zeros(256, dtype=np.int64)
+        for y in range(stack_in.shape[1]):
+            for x in range(stack_in.shape[2]):
+                hist[stack_in[i, y, x]] += 1
+        cdf = np.cumsum(hist)
+
+        # The number of pixels above level `k` will be <= `N_target`, whereas
+        # above level `k - 1` it will be > `N_target`. Pick the closest.
+        k = np.searchsorted(cdf, N_pixels - N_target)
+        if k > 0:
+            N_above_k = N_pixels - cdf[k]
+            N_above_k_min_1 = N_pixels - cdf[k - 1]
+            if (N_above_k_min_1 - N_target) < (N_target - N_above_k):
+                k -= 1
+
+        N_true = _binarize_frame(
+            stack_in[i],
+            k,
+            valve2px_flat,
+            stack_BW[i],
+            valves_stack[i],
+        )
+        alpha[i] = N_true / N_pixels
+        alpha_did_converge[i] = abs(alpha[i] - target_transparency) <= tol
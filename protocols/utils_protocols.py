@@ -15,15 +15,15 @@ from time import perf_counter
 from typing import Tuple
 
 import numpy as np
-from numba import prange
 from tqdm import trange
 
 from opensimplex_loops import looping_animated_2D_image
 from utils_img_stack import (
     add_stack_B_to_A,
     rescale_stack,
+    quantize_stack,
     binarize_stack_using_threshold,
-    binarize_stack_using_newton,
+    binarize_stack_using_histogram,
 )
 
 import constants as C
@@ -36,12 +36,13 @@ import config_proto_opensimplex as CFG
 
 def generate_OpenSimplex_grayscale_img_stack() -> np.ndarray:
     """Generate OpenSimplex noise as specified in `config_proto_OpenSimplex.py`.
-    Sets A and B will be mixed together into one image stack and rescaled to lie
-    within the grayscale value range [0-1].
+    Sets A and B will be mixed together into one image stack, rescaled to lie
+    within the range [0-1] and finally quantized to 8-bit grayscale values
+    [0-255].
 
     Returns:
         img_stack_out (np.ndarray):
-            2D image stack [time, y-pixel, x-pixel] containing float values.
+            2D image stack [time, y-pixel, x-pixel] containing `uint8` values.
             Array shape: [N_frames, N_pixels, N_pixels]
     """
 
@@ -77,7 +78,8 @@ def generate_OpenSimplex_grayscale_img_stack() -> np.ndarray:
     # distribution towards 0 or 1.
     rescale_stack(img_stack_A, symmetrically=True)
 
-    return img_stack_A
+    # Thresholding needs no more than 8 bits of grayscale resolution
+    return quantize_stack(img_stack_A)
 
 
 # ------------------------------------------------------------------------------
@@ -87,9 +89,10 @@ def generate_OpenSimplex_grayscale_img_stack() -> np.ndarray:
 
 def binarize_img_stack(
     img_stack_in: np.ndarray,
-) -> Tuple[np.ndarray, np.ndarray]:
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
     """Binarize the passed grayscale image stack `img_stack_in` using a
-    thresholding scheme as specified in `config_proto_OpenSimplex.py`.
+    thresholding scheme as specified in `config_proto_OpenSimplex.py`. The
+    state of each valve gets computed in the same pass over each frame.
 
     Returns: (Tuple)
         img_stack_BW (np.ndarray):
@@ -102,8 +105,17 @@ def binarize_img_stack(
             Array shape: [N_frames]
 
         alpha_did_converge (np.ndarray):
-            When the Newton solver is used, did it manage to converge to the
-            given target transparency per frame?
+            When solving for a target transparency, did the found threshold
+            result in a transparency within tolerance per frame?
+            Array shape: [N_frames]
+
+        valves_stack (np.ndarray):
+            Stack containing the boolean states of all valves as 0's and 1's.
+            Array shape: [N_frames, N_valves]
+
+        alpha_valves (np.ndarray):
+            Transparency of each `valves_stack` frame. Transparency is defined
+            as the number of opened valves over the total number of valves.
             Array shape: [N_frames]
     """
 
@@ -111,65 +123,47 @@ def binarize_img_stack(
     img_stack_BW = np.zeros(img_stack_in.shape, dtype=bool)
     alpha_BW = np.zeros(img_stack_in.shape[0])
     alpha_BW_did_converge = np.zeros(CFG.N_FRAMES, dtype=bool)
+    # NOTE: Use `int8` as type, not `bool` because we need `np.diff()` later.
+    valves_stack = np.zeros([CFG.N_FRAMES, C.N_VALVES], dtype=np.int8)
 
     if CFG.BW_THRESHOLD is not None:
         # Constant BW threshold
         # Values above `1 - BW_threshold` are set `True` (1), else `False` (0).
+        # The threshold is scaled to the [0-255] range of the grayscale levels.
         print("Binarizing noise using a constant threshold...")
         binarize_stack_using_threshold(
             img_stack_in,
-            1 - CFG.BW_THRESHOLD,
+            (1 - CFG.BW_THRESHOLD) * 255,
+            CFG.valve2px_flat,
             img_stack_BW,
             alpha_BW,
+            valves_stack,
         )
 
     else:
-        # Newton solver
+        # Histogram lookup
         print("Binarizing noise solving for a target transparency...")
-        binarize_stack_using_newton(
+        binarize_stack_using_histogram(
             img_stack_in,
             CFG.TARGET_TRANSPARENCY,
+            CFG.valve2px_flat,
             img_stack_BW,
             alpha_BW,
             alpha_BW_did_converge,
-        )
-
-    print(f"done in {(perf_counter() - tick):.2f} s\n")
-    return img_stack_BW, alpha_BW, alpha_BW_did_converge
-
-
-# ------------------------------------------------------------------------------
-#  compute_valves_stack
-# ------------------------------------------------------------------------------
-
-
-def compute_valves_stack(img_stack_BW: np.ndarray):
-    """Compute the state of each valve based on the passed BW image stack
-    `img_stack_BW`.
-
-    Returns: (Tuple)
-        valves_stack (np.ndarray):
-            Stack containing the boolean states of all valves as 0's and 1's.
-            Array shape: [N_frames, N_valves]
-
-        alpha_valves (np.ndarray):
-            Transparency of each `valves_stack` frame. Transparency is defined
-            as the number of opened valves over the total number of valves.
-            Array shape: [N_frames]
-    """
-
-    # NOTE: Use `int8` as type, not `bool` because we need `np.diff()` later.
-    valves_stack = np.zeros([CFG.N_FRAMES, C.N_VALVES], dtype=np.int8)
-
-    for frame in prange(CFG.N_FRAMES):  # pylint: disable=not-an-iterable
-        valves_stack[frame, :] = (
-            img_stack_BW[frame, CFG.valve2px_y, CFG.valve2px_x] == 1
+            valves_stack,
         )
 
     # Valve transparency
     alpha_valves = valves_stack.sum(1) / C.N_VALVES
 
-    return valves_stack, alpha_valves
+    print(f"done in {(perf_counter() - tick):.2f} s\n")
+    return (
+        img_stack_BW,
+        alpha_BW,
+        alpha_BW_did_converge,
+        valves_stack,
+        alpha_valves,
+    )
 
 
 # ------------------------------------------------------------------------------
@@ -192,9 +186,20 @@ def export_protocol_to_disk(valves_stack: np.ndarray, export_path: str):
     print(f"Exporting protocol to disk as '{export_path}'...")
     tick = perf_counter()
 
-    valves_stack = np.asarray(valves_stack, dtype=np.int8)
+    valves_stack = np.asarray(valves_stack, dtype=bool)
     N_frames, _ = valves_stack.shape
 
+    # Format the PCS coordinates of each valve only once. Each protocol line
+    # then becomes a single join over the opened valves of that frame.
+    valve_strs = np.array(
+        [f"\t{x:d},{y:d}" for x, y in zip(C.valve2pcs_x, C.valve2pcs_y)]
+    )
+    duration_str = f"{CFG.DT_FRAME*1000:.0f}"  # Duration in msec
+    lines = [
+        duration_str + "".join(valve_strs[valves_stack[frame_idx]]) + "\n"
+        for frame_idx in trange(N_frames)
+    ]
+
     with open(export_path, "w", encoding="utf-8") as f:
         # Write header info
         f.write("[HEADER]\n")
@@ -202,13 +207,6 @@ def export_protocol_to_disk(valves_stack: np.ndarray, export_path: str):
 
         # Write data
         f.write("[DATA]\n")
-        for frame_idx in trange(N_frames):
-            f.write(f"{CFG.DT_FRAME*1000:.0f}")  # Duration in msec
-            for valve_idx, state in enumerate(valves_stack[frame_idx, :]):
-                if state:
-                    pcs_x = C.valve2pcs_x[valve_idx]
-                    pcs_y = C.valve2pcs_y[valve_idx]
-                    f.write(f"\t{pcs_x:d},{pcs_y:d}")
-            f.write("\n")
+        f.writelines(lines)
 
     print(f"done in {perf_counter() - tick:.2f} s\n")
@@ -11,6 +11,11 @@ __version__ = "1.0.0"
 
 from typing import Tuple
 
+try:
+    from fastcrc import crc16 as _fastcrc16
+except ImportError:
+    _fastcrc16 = None
+
 # fmt:off
 auchCRCHi = [
     0x00, 0xC1, 0x81, 0x40, 0x01, 0xC0, 0x80, 0x41, 0x01, 0xC0, 0x80, 0x41, 0x00, 0xC1, 0x81,
@@ -58,13 +63,24 @@ def pretty_hex(bytes_in: bytes, delimiter=" ") -> str:
     """Pretty format and return the passed `bytes_in` as a string containing hex
     values grouped in pairs. E.g. b'\\x02\\xa2\\xff' returns '02 a2 ff'.
     """
+    if len(delimiter) == 1 and delimiter.isascii():
+        # Single C-level call, but only supports single ASCII delimiters
+        return bytes(bytes_in).hex(delimiter)
+
     return delimiter.join(f"{byte:02x}" for byte in bytes_in)
 
 
 def crc16(bytes_in: bytes) -> Tuple[int, int]:
     """Calculate and return the 16-bit CRC of the passed bytes sequence as
     (CRC Hi, CRC Lo).
+
+    When the optional `fastcrc` package is present its compiled Modbus CRC16
+    routine will be used instead of the table lookup in pure Python below.
     """
+    if _fastcrc16 is not None:
+        crc = _fastcrc16.modbus(bytes(bytes_in))
+        return crc & 0xFF, crc >> 8
+
     CRCHi = 0xFF
     CRCLo = 0xFF
     for byte in bytes_in:
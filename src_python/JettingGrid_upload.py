@@ -18,24 +18,55 @@ import sys
 import struct
 from pathlib import Path
 
+import numpy as np
+
 from JettingGrid_Arduino import JettingGrid_Arduino
 
 # ------------------------------------------------------------------------------
-#   Point `P` in the protocol coordinate system (PCS)
+#   Points in the protocol coordinate system (PCS)
 # -----------------------------------------------------------------------------
 
 # Constants
 PCS_X_MIN = -7
+PCS_X_MAX = 7
 PCS_Y_MIN = -7
+PCS_Y_MAX = 7
+
+# Lookup table holding the packed byte of each PCS point (x, y), indexed as
+# [x - PCS_X_MIN, y - PCS_Y_MIN]. The upper nibble holds the x-coordinate and
+# the lower nibble holds the y-coordinate, each offset by the minimum PCS
+# coordinate.
+_PACK_LUT = (
+    (np.arange(PCS_X_MAX - PCS_X_MIN + 1)[:, np.newaxis] << 4)
+    | (np.arange(PCS_Y_MAX - PCS_Y_MIN + 1)[np.newaxis, :] & 0xF)
+).astype(np.uint8)
+
+
+def pack_points_into_bytes(pcs_x: np.ndarray, pcs_y: np.ndarray) -> bytes:
+    """Pack each PCS point (x, y) into a single byte, all points at once, by
+    looking them up in `_PACK_LUT`.
+    """
+    pcs_x = np.asarray(pcs_x, dtype=np.int16)
+    pcs_y = np.asarray(pcs_y, dtype=np.int16)
+
+    # Negative indices would silently wrap around in the lookup table
+    if (
+        np.any(pcs_x < PCS_X_MIN)
+        or np.any(pcs_x > PCS_X_MAX)
+        or np.any(pcs_y < PCS_Y_MIN)
+        or np.any(pcs_y > PCS_Y_MAX)
+    ):
+        raise ValueError(
+            "PCS point out of range. Coordinates must lie within "
+            f"[{PCS_X_MIN}, {PCS_X_MAX}] for x and [{PCS_Y_MIN}, {PCS_Y_MAX}] "
+            "for y."
+        )
 
+    return _PACK_LUT[pcs_x - PCS_X_MIN, pcs_y - PCS_Y_MIN].tobytes()
 
-class P:
-    def __init__(self, x=0, y=0):
-        self.x = x
-        self.y = y
 
-    def pack_into_byte(self):
-        return ((self.x - PCS_X_MIN) << 4) | ((self.y - PCS_Y_MIN) & 0xF)
+# Precompiled packer for the time duration field heading each protocol line
+_DURATION_PACKER = struct.Struct(">H")
 
 
 # ------------------------------------------------------------------------------
@@ -112,11 +143,19 @@ def upload_protocol(
         duration = int(fields[0])
 
         # Build raw byte stream
-        raw = bytearray(struct.pack(">H", duration))  # Time duration [ms]
-        str_points = fields[1:]
-        for str_point in str_points:
-            str_x, str_y = str_point.split(",")
-            raw.append(P(int(str_x), int(str_y)).pack_into_byte())
+        raw = bytearray(_DURATION_PACKER.pack(duration))  # Time duration [ms]
+        if len(fields) > 1:
+            # Each field must hold exactly one point 'x,y', otherwise the
+            # flattened list below would silently pair up the wrong coordinates
+            if any(field.count(",") != 1 for field in fields[1:]):
+                raise ValueError(
+                    f"Malformed PCS point on protocol line {idx_line + 1}: "
+                    f"{line!r}"
+                )
+
+            # Flattened list of all coordinates: x0, y0, x1, y1, ...
+            pcs = np.array(",".join(fields[1:]).split(","), dtype=np.int16)
+            raw.extend(pack_points_into_bytes(pcs[0::2], pcs[1::2]))
 
         # Send out raw byte stream
         grid.write(raw)
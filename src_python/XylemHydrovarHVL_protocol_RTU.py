@@ -22,8 +22,10 @@ __version__ = "1.0.0"
 # pylint: disable=invalid-name
 
 import sys
-from typing import Tuple, Union
+from typing import List, Tuple, Union
 from enum import IntEnum
+from dataclasses import dataclass
+from functools import lru_cache
 import time
 
 import numpy as np
@@ -60,7 +62,7 @@ class HVL_Mode(IntEnum):
 
 class HVL_FuncCode(IntEnum):
     # Implemented:
-    READ = 0x03  # Read the contents of a single register
+    READ = 0x03  # Read the contents of one or more contiguous registers
     WRITE = 0x06  # Write a value into a single register
 
     # Not implemented:
@@ -78,6 +80,25 @@ class HVL_DType(IntEnum):
     B2 = 7  # 32 bits bitmap
 
 
+# Sign bit of each signed datum type. Raw unsigned value `x` is converted to its
+# two's-complement signed value as `(x ^ m) - m`, without branching. Unsigned
+# datum types map to 0, leaving `x` as is.
+_SIGN_BIT = {
+    HVL_DType.S08: 1 << 7,
+    HVL_DType.S16: 1 << 15,
+}
+
+
+# ------------------------------------------------------------------------------
+#   _bit_property
+# ------------------------------------------------------------------------------
+
+
+def _bit_property(bit: int) -> property:
+    """Read-only boolean property reflecting a single bit of member `bits`."""
+    return property(lambda self: bool(self.bits & (1 << bit)))
+
+
 # ------------------------------------------------------------------------------
 #   HVL_Register
 # ------------------------------------------------------------------------------
@@ -142,6 +163,44 @@ HVLREG_DEV_STATUS_H4 = HVL_Register(0x01c1, HVL_DType.B1)   # R     P-
 
 # fmt: on
 
+# ------------------------------------------------------------------------------
+#   RTU command construction
+# ------------------------------------------------------------------------------
+# The commands only depend on a handful of integers and a limited set of
+# registers gets polled over and over again. Hence, we cache the fully built
+# commands including their CRC.
+
+
+@lru_cache(maxsize=256)
+def _RTU_read_command(slave_address: int, address: int, N_points: int) -> bytes:
+    """Construct a 'read' RTU command, including CRC."""
+    byte_cmd = bytearray(8)
+    byte_cmd[0] = slave_address
+    byte_cmd[1] = HVL_FuncCode.READ
+    byte_cmd[2] = (address & 0xFF00) >> 8  # address HI
+    byte_cmd[3] = address & 0x00FF  # address LO
+    byte_cmd[4] = (N_points & 0xFF00) >> 8  # no. of points HI
+    byte_cmd[5] = N_points & 0x00FF  # no. of points LO
+    byte_cmd[6:] = crc16(byte_cmd[:6])
+
+    return bytes(byte_cmd)
+
+
+@lru_cache(maxsize=256)
+def _RTU_write_command(slave_address: int, address: int, value: int) -> bytes:
+    """Construct a 'write' RTU command, including CRC."""
+    byte_cmd = bytearray(8)
+    byte_cmd[0] = slave_address
+    byte_cmd[1] = HVL_FuncCode.WRITE
+    byte_cmd[2] = (address & 0xFF00) >> 8  # address HI
+    byte_cmd[3] = address & 0x00FF  # address LO
+    byte_cmd[4] = (value & 0xFF00) >> 8  # data HI
+    byte_cmd[5] = value & 0x00FF  # data LO
+    byte_cmd[6:] = crc16(byte_cmd[:6])
+
+    return bytes(byte_cmd)
+
+
 # ------------------------------------------------------------------------------
 #   XylemHydrovarHVL
 # ------------------------------------------------------------------------------
@@ -173,46 +232,36 @@ class XylemHydrovarHVL(SerialDevice):
         inverter_curr_pct  = np.nan  # [% FS]     derived: P44 / P268 * 100
         # fmt: on
 
+    @dataclass(slots=True)
     class ErrorStatus:
-        """Container for the Error Status bits (H3)"""
+        """Container for the Error Status bits (H3). The bits are stored packed
+        as a single integer, the individual errors are exposed as properties.
+        """
+
+        bits: int = 0  # Error bits 00 to 11 as read
 
         # fmt: off
-        overcurrent       = False  # bit 00, error 11
-        overload          = False  # bit 01, error 12
-        overvoltage       = False  # bit 02, error 13
-        phase_loss        = False  # bit 03, error 16
-        inverter_overheat = False  # bit 04, error 14
-        motor_overheat    = False  # bit 05, error 15
-        lack_of_water     = False  # bit 06, error 21
-        minimum_threshold = False  # bit 07, error 22
-        act_val_sensor_1  = False  # bit 08, error 23
-        act_val_sensor_2  = False  # bit 09, error 24
-        setpoint_1_low_mA = False  # bit 10, error 25
-        setpoint_2_low_mA = False  # bit 11, error 26
+        overcurrent       = _bit_property(0)   # bit 00, error 11
+        overload          = _bit_property(1)   # bit 01, error 12
+        overvoltage       = _bit_property(2)   # bit 02, error 13
+        phase_loss        = _bit_property(3)   # bit 03, error 16
+        inverter_overheat = _bit_property(4)   # bit 04, error 14
+        motor_overheat    = _bit_property(5)   # bit 05, error 15
+        lack_of_water     = _bit_property(6)   # bit 06, error 21
+        minimum_threshold = _bit_property(7)   # bit 07, error 22
+        act_val_sensor_1  = _bit_property(8)   # bit 08, error 23
+        act_val_sensor_2  = _bit_property(9)   # bit 09, error 24
+        setpoint_1_low_mA = _bit_property(10)  # bit 10, error 25
+        setpoint_2_low_mA = _bit_property(11)  # bit 11, error 26
         # fmt: on
 
         def has_error(self) -> bool:
-            error_list = (
-                self.overcurrent,
-                self.overload,
-                self.overvoltage,
-                self.phase_loss,
-                self.inverter_overheat,
-                self.motor_overheat,
-                self.lack_of_water,
-                self.minimum_threshold,
-                self.act_val_sensor_1,
-                self.act_val_sensor_2,
-                self.setpoint_1_low_mA,
-                self.setpoint_2_low_mA,
-            )
-
-            return np.any(error_list, where=True)
+            return self.bits != 0
 
         def report(self):
             """Report the last read error status to the terminal."""
 
-            if not self.has_error():
+            if self.bits == 0:
                 print("No errors")
                 return
 
@@ -243,6 +292,7 @@ class XylemHydrovarHVL(SerialDevice):
             if self.setpoint_2_low_mA:
                 print("- #26: SETPOINT 2 I<4 mA")
 
+    @dataclass(slots=True)
     class DeviceStatus:
         """Container for the Extended Device Status bits (H4).
 
@@ -262,15 +312,15 @@ class XylemHydrovarHVL(SerialDevice):
         """
 
         # fmt: off
-        device_is_preset                    = False  # bit 00
-        device_is_ready_for_regulation      = False  # bit 01
-        device_has_an_error                 = False  # bit 02
-        device_has_a_warning                = False  # bit 03
-        external_ON_OFF_terminal_enabled    = False  # bit 04
-        device_is_enabled_with_start_button = False  # bit 05
-        motor_is_running                    = False  # bit 06
-        solo_run_ON_OFF                     = False  # bit 14
-        inverter_STOP_START                 = False  # bit 15
+        device_is_preset:                    bool = False  # bit 00
+        device_is_ready_for_regulation:      bool = False  # bit 01
+        device_has_an_error:                 bool = False  # bit 02
+        device_has_a_warning:                bool = False  # bit 03
+        external_ON_OFF_terminal_enabled:    bool = False  # bit 04
+        device_is_enabled_with_start_button: bool = False  # bit 05
+        motor_is_running:                    bool = False  # bit 06
+        solo_run_ON_OFF:                     bool = False  # bit 14
+        inverter_STOP_START:                 bool = False  # bit 15
         # fmt: on
 
         def report(self):
@@ -339,6 +389,9 @@ class XylemHydrovarHVL(SerialDevice):
         # Modbus demands minimum time between messages
         self._tick_last_msg = time.perf_counter()
 
+        # Cleared as soon as the HVL rejects a multi-register 'read' command
+        self._block_read_is_supported = True
+
     # --------------------------------------------------------------------------
     #   ID_validation_query
     # --------------------------------------------------------------------------
@@ -375,48 +428,33 @@ class XylemHydrovarHVL(SerialDevice):
         )
 
     # --------------------------------------------------------------------------
-    #   _RTU_read
+    #   _RTU_query
     # --------------------------------------------------------------------------
 
-    def _RTU_read(self, hvlreg: HVL_Register) -> Tuple[bool, Union[int, None]]:
-        """Send a 'read' RTU command over Modbus to the slave device.
+    def _RTU_query(
+        self, byte_cmd: bytes, N_expected_reply_bytes: int
+    ) -> Tuple[bool, Union[bytes, None]]:
+        """Send an RTU command over Modbus to the slave device and read its
+        reply, while respecting the silent period between messages.
 
         Args:
-            hvlreg (HVL_Register):
-                `HVL_Register` object containing Modbus address to read from and
-                its datum type.
+            byte_cmd (bytes):
+                Full RTU command, including CRC.
+
+            N_expected_reply_bytes (int):
+                Number of bytes of a successful reply.
 
         Returns: (Tuple)
             success (bool):
                 True if successful, False otherwise.
 
-            data_val (int | None):
-                Read data value as raw integer. `None` if unsuccessful.
+            reply (bytes | None):
+                Reply received. `None` if the device is not alive.
         """
         if not self.is_alive:
             pft("Device is not connected yet or already closed.", 3)
             return False, None  # --> leaving
 
-        # Construct 'read' command
-        byte_cmd = bytearray(8)
-        byte_cmd[0] = self.modbus_slave_address
-        byte_cmd[1] = HVL_FuncCode.READ
-        byte_cmd[2] = (hvlreg.address & 0xFF00) >> 8  # address HI
-        byte_cmd[3] = hvlreg.address & 0x00FF  # address LO
-
-        # NOTE: A 'point' is a single register. According to the ModBus
-        # specification a single register is always 2 bytes == 16 bits long.
-        # 1 point == 1 register == 2 bytes == 16 bits
-        byte_cmd[4] = 0x00  # no. of points HI
-
-        # no. of points LO
-        if hvlreg.datum_type in (HVL_DType.U32, HVL_DType.B2):
-            byte_cmd[5] = 0x02  # 2 points == 32 bits
-        else:
-            byte_cmd[5] = 0x01  # 1 point == 16 bits
-
-        byte_cmd[6:] = crc16(byte_cmd[:6])
-
         # Slow down message rate according to Modbus specification
         silent_period = self._calculate_silent_period()
         time_since_last_msg = time.perf_counter() - self._tick_last_msg
@@ -424,17 +462,55 @@ class XylemHydrovarHVL(SerialDevice):
             accurate_delay_ms((silent_period - time_since_last_msg) * 1000)
 
         # Send command and read reply
-        if hvlreg.datum_type in (HVL_DType.U32, HVL_DType.B2):
-            N_expected_reply_bytes = 9
-        else:
-            N_expected_reply_bytes = 7
-
         success, reply = self.query_bytes(
             msg=byte_cmd,
             N_bytes_to_read=N_expected_reply_bytes,
         )
         self._tick_last_msg = time.perf_counter()
 
+        if not success and isinstance(reply, bytes):
+            # Probably received a Modbus exception.
+            # TODO: Test for and parse Modbus exceptions.
+            print(f"Reply received: {pretty_hex(reply)}")
+
+        return success, reply
+
+    # --------------------------------------------------------------------------
+    #   _RTU_read
+    # --------------------------------------------------------------------------
+
+    def _RTU_read(self, hvlreg: HVL_Register) -> Tuple[bool, Union[int, None]]:
+        """Send a 'read' RTU command over Modbus to the slave device.
+
+        Args:
+            hvlreg (HVL_Register):
+                `HVL_Register` object containing Modbus address to read from and
+                its datum type.
+
+        Returns: (Tuple)
+            success (bool):
+                True if successful, False otherwise.
+
+            data_val (int | None):
+                Read data value as raw integer. `None` if unsuccessful.
+        """
+        # NOTE: A 'point' is a single register. According to the ModBus
+        # specification a single register is always 2 bytes == 16 bits long.
+        # 1 point == 1 register == 2 bytes == 16 bits
+        if hvlreg.datum_type in (HVL_DType.U32, HVL_DType.B2):
+            N_points = 2  # 2 points == 32 bits
+        else:
+            N_points = 1  # 1 point == 16 bits
+
+        # Construct 'read' command
+        byte_cmd = _RTU_read_command(
+            self.modbus_slave_address, hvlreg.address, N_points
+        )
+
+        # Send command and read reply
+        N_expected_reply_bytes = 5 + 2 * N_points
+        success, reply = self._RTU_query(byte_cmd, N_expected_reply_bytes)
+
         # Parse the returned data value
         data_val = None
         if success and isinstance(reply, bytes):
@@ -468,20 +544,91 @@ class XylemHydrovarHVL(SerialDevice):
                     print(f"Reply received: {pretty_hex(reply)}")
                     return False, None  # --> leaving
 
-                if hvlreg.datum_type == HVL_DType.S08:
-                    if data_val >= (1 << 7):
-                        data_val = data_val - (1 << 8)
-                elif hvlreg.datum_type == HVL_DType.S16:
-                    if data_val >= (1 << 15):
-                        data_val = data_val - (1 << 16)
-
-        if not success and isinstance(reply, bytes):
-            # Probably received a Modbus exception.
-            # TODO: Test for and parse Modbus exceptions.
-            print(f"Reply received: {pretty_hex(reply)}")
+                m = _SIGN_BIT.get(hvlreg.datum_type, 0)
+                data_val = (data_val ^ m) - m
 
         return success, data_val
 
+    # --------------------------------------------------------------------------
+    #   _RTU_read_block
+    # --------------------------------------------------------------------------
+
+    def _RTU_read_block(
+        self, hvlregs: Tuple[HVL_Register, ...]
+    ) -> Tuple[bool, Union[List[int], None]]:
+        """Send a single 'read' RTU command over Modbus to the slave device,
+        reading out a block of contiguous registers in one go. This saves a
+        full Modbus round trip for each additional register.
+
+        Args:
+            hvlregs (Tuple[HVL_Register, ...]):
+                `HVL_Register` objects of 16-bit datum types with contiguous
+                Modbus addresses, in increasing order.
+
+        Returns: (Tuple)
+            success (bool):
+                True if successful, False otherwise.
+
+            data_vals (List[int] | None):
+                Read data values as raw integers, one for each register.
+                `None` if unsuccessful.
+
+        When the device replies with an unexpected byte count or a Modbus
+        exception, `self._block_read_is_supported` gets cleared.
+        """
+        N_points = len(hvlregs)
+        for idx, hvlreg in enumerate(hvlregs):
+            if (hvlreg.address != hvlregs[0].address + idx) or (
+                hvlreg.datum_type in (HVL_DType.U32, HVL_DType.B2)
+            ):
+                pft(
+                    "Unsupported block of registers. Only contiguous registers "
+                    "of 16-bit datum types are implemented."
+                )
+                return False, None  # --> leaving
+
+        # Construct 'read' command
+        byte_cmd = _RTU_read_command(
+            self.modbus_slave_address, hvlregs[0].address, N_points
+        )
+
+        # Send command and read reply
+        N_expected_reply_bytes = 5 + 2 * N_points
+        success, reply = self._RTU_query(byte_cmd, N_expected_reply_bytes)
+
+        # Parse the returned data values
+        data_vals = None
+        if success and isinstance(reply, bytes):
+            if len(reply) == N_expected_reply_bytes:
+                # All is correct
+                byte_count = reply[2]
+                if byte_count != 2 * N_points:
+                    pft(
+                        f"Unexpected byte count. Got {byte_count}, "
+                        f"but expected {2 * N_points}."
+                    )
+                    print(f"Reply received: {pretty_hex(reply)}")
+                    self._block_read_is_supported = False
+                    return False, None  # --> leaving
+
+                raw_vals = np.frombuffer(
+                    reply, dtype=">u2", count=N_points, offset=3
+                )
+                data_vals = []
+                for hvlreg, raw_val in zip(hvlregs, raw_vals.tolist()):
+                    m = _SIGN_BIT.get(hvlreg.datum_type, 0)
+                    data_vals.append((raw_val ^ m) - m)
+
+        elif (
+            isinstance(reply, bytes)
+            and len(reply) >= 2
+            and reply[1] == 0x80 | HVL_FuncCode.READ
+        ):
+            # Modbus exception: The device refuses the block read
+            self._block_read_is_supported = False
+
+        return success, data_vals
+
     # --------------------------------------------------------------------------
     #   _RTU_write
     # --------------------------------------------------------------------------
@@ -506,43 +653,21 @@ class XylemHydrovarHVL(SerialDevice):
             data_val (int | None):
                 Obtained data value as raw integer. `None` if unsuccessful.
         """
-        if not self.is_alive:
-            pft("Device is not connected yet or already closed.", 3)
-            return False, None  # --> leaving
-
-        # Construct 'write' command
-        byte_cmd = bytearray(8)
-        byte_cmd[0] = self.modbus_slave_address
-        byte_cmd[1] = HVL_FuncCode.WRITE
-        byte_cmd[2] = (hvlreg.address & 0xFF00) >> 8  # address HI
-        byte_cmd[3] = hvlreg.address & 0x00FF  # address LO
-
-        if hvlreg.datum_type in (HVL_DType.U08, HVL_DType.U16):
-            byte_cmd[4] = (value & 0xFF00) >> 8  # data HI
-            byte_cmd[5] = value & 0x00FF  # data LO
-        else:
+        if hvlreg.datum_type not in (HVL_DType.U08, HVL_DType.U16):
             pft(
                 f"Unsupported datum type. Got {hvlreg.datum_type}, "
                 "but only U08 and U16 are implemented."
             )
             return False, None
 
-        byte_cmd[6:] = crc16(byte_cmd[:6])
-
-        # Slow down message rate according to Modbus specification
-        silent_period = self._calculate_silent_period()
-        time_since_last_msg = time.perf_counter() - self._tick_last_msg
-        if time_since_last_msg < silent_period:
-            accurate_delay_ms((silent_period - time_since_last_msg) * 1000)
+        # Construct 'write' command
+        byte_cmd = _RTU_write_command(
+            self.modbus_slave_address, hvlreg.address, value
+        )
 
         # Send command and read reply
         N_expected_reply_bytes = 8  # Successful 'write' reply is 8 bytes long
-
-        success, reply = self.query_bytes(
-            msg=byte_cmd,
-            N_bytes_to_read=N_expected_reply_bytes,
-        )
-        self._tick_last_msg = time.perf_counter()
+        success, reply = self._RTU_query(byte_cmd, N_expected_reply_bytes)
 
         # Parse the returned data value
         data_val = None
@@ -551,15 +676,8 @@ class XylemHydrovarHVL(SerialDevice):
                 # All is correct
                 data_val = (reply[4] << 8) + reply[5]
 
-                if hvlreg.datum_type == HVL_DType.S08:
-                    data_val = data_val - (1 << 8)
-                elif hvlreg.datum_type == HVL_DType.S16:
-                    data_val = data_val - (1 << 16)
-
-        if not success and isinstance(reply, bytes):
-            # Probably received a Modbus exception.
-            # TODO: Test for and parse Modbus exceptions.
-            print(f"Reply received: {pretty_hex(reply)}")
+                m = _SIGN_BIT.get(hvlreg.datum_type, 0)
+                data_val = (data_val ^ m) - m
 
         return success, data_val
 
@@ -747,6 +865,33 @@ class XylemHydrovarHVL(SerialDevice):
 
         return success
 
+    def read_actual_pressure_and_frequency(self) -> bool:
+        """Read the actual pressure in bar and the actual frequency of the
+        inverter in Hz. Their registers are contiguous, hence both get read in a
+        single Modbus transaction. Once the HVL has rejected the block read, we
+        fall back to reading out both registers separately from then on.
+        Readings will be stored in class member `state`.
+        """
+        if self._block_read_is_supported:
+            success, data_vals = self._RTU_read_block(
+                (HVLREG_ACTUAL_VALUE, HVLREG_OUTPUT_FREQ)
+            )
+            if data_vals is not None:
+                self.state.actual_pressure = float(data_vals[0]) / 100
+                self.state.actual_frequency = float(data_vals[1]) / 10
+
+            if self._block_read_is_supported:
+                # Either success or a communication failure, like a timeout,
+                # which the separate reads would suffer from as well
+                return success  # --> leaving
+
+            print("HVL rejected the block read. Falling back to single reads.")
+
+        success = self.read_actual_pressure()
+        success &= self.read_actual_frequency()
+
+        return success
+
     def set_wanted_pressure(self, P_bar: float) -> bool:
         """P820: Set the digital required value 1 in bar.
         Readings will be stored in class member `state`.
@@ -884,22 +1029,9 @@ class XylemHydrovarHVL(SerialDevice):
         """Readings will be stored in class member `error_status`."""
         success, data_val = self._RTU_read(HVLREG_ERRORS_H3)
         if data_val is not None:
-            s = self.error_status  # Shorthand
-            # fmt: off
-            s.overcurrent       = bool(data_val & (1 << 0))
-            s.overload          = bool(data_val & (1 << 1))
-            s.overvoltage       = bool(data_val & (1 << 2))
-            s.phase_loss        = bool(data_val & (1 << 3))
-            s.inverter_overheat = bool(data_val & (1 << 4))
-            s.motor_overheat    = bool(data_val & (1 << 5))
-            s.lack_of_water     = bool(data_val & (1 << 6))
-            s.minimum_threshold = bool(data_val & (1 << 7))
-            s.act_val_sensor_1  = bool(data_val & (1 << 8))
-            s.act_val_sensor_2  = bool(data_val & (1 << 9))
-            s.setpoint_1_low_mA = bool(data_val & (1 << 10))
-            s.setpoint_2_low_mA = bool(data_val & (1 << 11))
-            # fmt: on
-            # s.report()
+            # Only bits 00 to 11 are in use
+            self.error_status.bits = data_val & 0xFFF
+            # self.error_status.report()
 
         return success
 
@@ -180,8 +180,7 @@ class XylemHydrovarHVL_qdev(QDeviceIO):
 
         success = self.dev.read_error_status()
         success &= self.dev.read_device_status()
-        success &= self.dev.read_actual_pressure()
-        success &= self.dev.read_actual_frequency()
+        success &= self.dev.read_actual_pressure_and_frequency()
 
         if (self.update_counter_DAQ % 5) == 0:
             success &= self.dev.read_inverter_diagnostics()